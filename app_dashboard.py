@@ -1,214 +1,512 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import json
+import plotly.io as pio
+import orjson
 import time
+import os
+import tempfile
+import contextlib
+import logging
+import threading
 import requests
-import io
 
-import requests
-import io
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; workers there simply don't coordinate downloads
+    fcntl = None
+
+# Serialize figures with orjson's C encoder instead of the stdlib json path
+pio.json.config.default_engine = "orjson"
 
 # --- Configuration ---
 # For public sheets, use the CSV export URL
 GOOGLE_SHEET_ID = "179XQa9LLvivItAPTZZ0o3v6iu_TEBdcF7zFX1eK3r04"
 GOOGLE_SHEET_URL = f"https://docs.google.com/spreadsheets/d/{GOOGLE_SHEET_ID}/export?format=csv&gid=0"
 
+# Score columns, coerced to float32 after the read (unparseable cells become NaN)
+NUMERIC_COLS = ["output.confidence", "output.sentiment_score", "output.priority_score"]
+# Low-cardinality label columns, read as text and stored as pandas categoricals
+CATEGORY_COLS = [
+    "output.routing_recommendation.department",
+    "output.urgency_level",
+    "output.predicted_intent",
+    "output.extracted_product",
+    "output.extracted_requested_action",
+]
+# Issue date, kept as the sheet's text; a parsed copy for the volume chart is added once per download
+DATE_COL = "output.extracted_date_of_issue"
+PARSED_DATE_COL = "_parsed_date_of_issue"
+
+# Columns the panels read directly
+REQUIRED_COLUMNS = CATEGORY_COLS + [DATE_COL]
+
+# Oldest the data on screen may get, in seconds. Three delays stack: a session polls for new data
+# every REFRESH_INTERVAL, the loader's in-process cache keeps a result for DATA_CACHE_TTL, and the
+# shared file cache hands out a download until it is SHARED_CACHE_MAX_AGE old.
+DATA_MAX_AGE = 60
+REFRESH_INTERVAL = DATA_MAX_AGE // 2
+DATA_CACHE_TTL = DATA_MAX_AGE // 4
+SHARED_CACHE_MAX_AGE = DATA_MAX_AGE - REFRESH_INTERVAL - DATA_CACHE_TTL
+
+# Parsed sheet shared between Streamlit worker processes. It lives in a directory only this user can
+# write to (not the world-writable temp dir), and is named per sheet so dashboards don't mix data.
+SHARED_CACHE_DIR = os.environ.get(
+    "EMAIL_DASHBOARD_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "email_dashboard")
+)
+SHARED_CACHE_PATH = os.path.join(SHARED_CACHE_DIR, f"{GOOGLE_SHEET_ID}.parquet")
+
+# Results keyed on a frame's content never go stale, so those caches are bounded by size instead of a TTL.
+# Room for the four bar charts over several data versions.
+CONTENT_CACHE_ENTRIES = 16
+
 # --- Helper Functions ---
-@st.cache_data(ttl=30)  # Cache for 30 seconds
+@st.cache_resource
+def get_http_session():
+    """
+    Returns a shared requests.Session so the TCP/TLS connections to Google are reused across refreshes.
+    The export URL redirects to a googleusercontent.com host, so the default pool keeps both hosts' connections.
+    """
+    session = requests.Session()
+    session.headers["Accept-Encoding"] = "gzip"  # The CSV compresses well
+    return session
+
+
+@st.cache_resource
+def get_download_state():
+    """
+    Returns the process-wide validators and parsed frame of the last download, used for conditional GETs.
+    The loader's cache is shared by all sessions, so this state is too; the lock keeps downloads one at a time.
+    """
+    return {"lock": threading.Lock(), "etag": "", "last_modified": "", "df": None}
+
+
+def fetch_email_data():
+    """
+    Downloads the sheet's CSV export and parses it into a typed DataFrame.
+    """
+    state = get_download_state()
+    with state["lock"]:
+        df, etag, last_modified = download_email_data(state)
+        # Remember the validators and the parsed frame for the next conditional GET
+        state.update(etag=etag, last_modified=last_modified, df=df)
+    return df
+
+
+def download_email_data(state):
+    """
+    Sends a conditional GET for the sheet and returns (DataFrame, ETag, Last-Modified).
+    """
+    # Send a conditional GET so an unchanged sheet is answered with an empty 304
+    headers = {}
+    if state["etag"]:
+        headers["If-None-Match"] = state["etag"]
+    if state["last_modified"]:
+        headers["If-Modified-Since"] = state["last_modified"]
+
+    # Download CSV data from Google Sheets, streaming the body instead of buffering it
+    with get_http_session().get(GOOGLE_SHEET_URL, headers=headers, stream=True, timeout=10) as response:
+        if response.status_code == 304 and state["df"] is not None:
+            return state["df"], state["etag"], state["last_modified"]
+        response.raise_for_status()
+        response.raw.decode_content = True  # Undo any gzip content encoding while reading
+
+        # Parse straight off the socket with the multithreaded Arrow parser
+        df = pd.read_csv(
+            response.raw,
+            engine="pyarrow",
+            dtype_backend="pyarrow",
+            dtype={col: "string[pyarrow]" for col in NUMERIC_COLS + CATEGORY_COLS + [DATE_COL]},
+        )
+    
+    # Clean the data
+    df = df.dropna(how='all')  # Remove completely empty rows
+
+    # A stray non-numeric score must not fail the whole read, so coerce instead of typing at parse time
+    for col in NUMERIC_COLS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float32")
+
+    # Categorize after the read: the reader rejects a "category" dtype for a column with no values
+    for col in CATEGORY_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+
+    # Convert the issue date once per download instead of on every rerun, into its own column so the
+    # Latest Email panel still shows the date as written.
+    # Not done via parse_dates: the Arrow reader leaves the whole column as text if one value is malformed.
+    # The dates are pulled out of email text, so each value is parsed on its own ("mixed") rather than
+    # assuming the format of the first one; cache=True parses each distinct string only once.
+    if DATE_COL in df.columns:
+        df[PARSED_DATE_COL] = pd.to_datetime(df[DATE_COL], errors="coerce", format="mixed", cache=True)
+
+    return df, response.headers.get("ETag", ""), response.headers.get("Last-Modified", "")
+
+
+@contextlib.contextmanager
+def shared_cache_lock():
+    """
+    Holds an exclusive lock next to the shared cache file so only one worker downloads the sheet at a time.
+    """
+    if fcntl is None:
+        yield
+        return
+    try:
+        os.makedirs(SHARED_CACHE_DIR, mode=0o700, exist_ok=True)
+        # Append mode so opening never truncates or recreates a file another worker holds locked
+        lock_file = open(SHARED_CACHE_PATH + ".lock", "a")
+    except OSError:  # No usable cache directory; download without coordinating
+        yield
+        return
+    with lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def read_shared_cache():
+    """
+    Returns the DataFrame a worker saved within the last SHARED_CACHE_MAX_AGE seconds, or None.
+    """
+    try:
+        if os.path.getmtime(SHARED_CACHE_PATH) > time.time() - SHARED_CACHE_MAX_AGE:
+            return pd.read_parquet(SHARED_CACHE_PATH)
+    except OSError:
+        pass  # No cache file yet
+    return None
+
+
+def write_shared_cache(df):
+    """
+    Saves the DataFrame for the other workers, swapping the file in atomically so readers never see a partial write.
+    A failed write only costs the other workers a download, so it is logged rather than raised.
+    """
+    tmp_path = None
+    try:
+        os.makedirs(SHARED_CACHE_DIR, mode=0o700, exist_ok=True)
+        # mkstemp picks an unused name and creates the file exclusively, readable by this user only
+        fd, tmp_path = tempfile.mkstemp(dir=SHARED_CACHE_DIR, suffix=".tmp")
+        os.close(fd)
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, SHARED_CACHE_PATH)
+    except Exception as e:
+        logging.getLogger(__name__).warning("Could not write shared cache %s: %s", SHARED_CACHE_PATH, e)
+        if tmp_path is not None:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+
+
+@st.cache_data(ttl=DATA_CACHE_TTL)
 def load_email_data_from_gsheets():
     """
     Connects to Google Sheets and loads the data into a DataFrame using CSV export.
+    Workers share each download through a parquet file, so only one of them hits Google per refresh.
     """
     try:
-        # Download CSV data from Google Sheets
-        response = requests.get(GOOGLE_SHEET_URL)
-        response.raise_for_status()
-        
-        # Read CSV data into DataFrame
-        df = pd.read_csv(io.StringIO(response.text))
-        
-        # Clean the data
-        df = df.dropna(how='all')  # Remove completely empty rows
-        df = df.fillna('')  # Fill remaining NaN values with empty strings
-        
-        # Ensure numeric columns are correctly typed
-        numeric_cols = ["output.confidence", "output.sentiment_score", "output.priority_score"]
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
+        # Another worker may have downloaded the sheet moments ago; reuse its parsed copy
+        df = read_shared_cache()
+        if df is not None:
+            return df
 
+        with shared_cache_lock():
+            # The worker that held the lock before us may have just refreshed the file
+            df = read_shared_cache()
+            if df is None:
+                df = fetch_email_data()
+                write_shared_cache(df)
         return df
     except Exception as e:
         st.error(f"Error loading data from Google Sheets: {str(e)}")
         return pd.DataFrame()
 
 
-# --- Streamlit App Layout ---
-st.set_page_config(layout="wide", page_title="Email Workflow Dashboard")
+def hash_dataframe(df):
+    """
+    Hashes a DataFrame by content; cheaper than Streamlit's default DataFrame hashing.
+    """
+    return pd.util.hash_pandas_object(df, index=True).values.tobytes()
 
 
-st.title("✉️ Customer Email Insights Dashboard")
-#time.sleep(5)
-#st.rerun()
-df = load_email_data_from_gsheets()
-#print(df)
-if df.empty:
-    st.warning("No email data available. Please check your Google Sheet connection.")
-else:
-    # Show data info
-    #st.success(f"✅ Successfully loaded {len(df)} rows of data")
-    st.info(f"⏰ Last updated: {time.strftime('%Y-%m-%d %H:%M:%S')}")
+def count_values(df, col, label):
+    """
+    Returns the value counts of one label column, counted on its categorical codes and left unsorted.
+    """
+    counts = df[col].value_counts(sort=False)
+    return counts.rename_axis(label).reset_index(name="Count")
 
-col1, col2, col3 = st.columns([2, 1, 1])
-with col1:
-    st.header("📋 Latest Email (JSON Format)")
-    if len(df) > 0:
-        latest_row = df.iloc[-1].to_dict()  # Get the last row
-        st.json(latest_row)
 
-with col2:
-    st.header("Total Emails")
-    email_count = (len(df))
-    st.markdown(
-        f"""
-        <div style='
-            font-size: 164px;
-            font-weight: bold;
-            color: #00ffcc;
-            text-align: center;
-            animation: pulse 1.5s infinite;
-        '>{email_count}</div>
+def group_complaints_by_date(df):
+    """
+    Counts complaints per issue date, skipping rows whose date could not be parsed.
+    """
+    # value_counts drops NaT itself; skip its count sort since the result is ordered by date anyway
+    counts = df[PARSED_DATE_COL].value_counts(sort=False).sort_index()
+    return counts.rename_axis(DATE_COL).reset_index(name="Count")
+
 
+@st.cache_resource
+def pulse_css():
+    """
+    Returns the pulse animation and the headline styles shared by the pulsing panels.
+    """
+    return """
         <style>
-        @keyframes pulse {{
-            0% {{ transform: scale(1); }}
-            50% {{ transform: scale(1.2); }}
-            100% {{ transform: scale(1); }}
-        }}
+        @keyframes pulse {
+            0% { transform: scale(1); opacity: 1; }
+            50% { transform: scale(1.1); opacity: 0.7; }
+            100% { transform: scale(1); opacity: 1; }
+        }
+        .pulse { font-weight: bold; text-align: center; animation: pulse 1.5s infinite; }
+        .pulse-count { font-size: 164px; color: #00ffcc; }
+        .pulse-action { font-size: 36px; color: #aeb002; }
+        .pulse-department { font-size: 72px; color: #ffa500; }
         </style>
-        """,
-        unsafe_allow_html=True
-    )
-    
-with col3:
+        """
+
+
+@st.cache_data(max_entries=CONTENT_CACHE_ENTRIES, hash_funcs={pd.DataFrame: hash_dataframe})
+def bar_figure(counts, label, y_title="Count", template=None):
+    """
+    Builds a bar chart as a plain Plotly dict, one trace per category so each bar gets its own color.
+    """
+    fig = {
+        "data": [
+            {"type": "bar", "name": str(name), "x": [name], "y": [count]}
+            for name, count in zip(counts[label].tolist(), counts["Count"].tolist())
+        ],
+        "layout": {
+            "barmode": "relative",
+            "xaxis": {"title": {"text": label}},
+            "yaxis": {"title": {"text": y_title}},
+            "legend": {"title": {"text": label}},
+        },
+    }
+    if template:
+        fig["layout"]["template"] = template
+    return fig
+
+
+@st.cache_data(max_entries=CONTENT_CACHE_ENTRIES, hash_funcs={pd.DataFrame: hash_dataframe})
+def pie_figure(counts, label):
+    """
+    Builds a pie chart of a count table as a plain Plotly dict. Columns go in as numpy arrays,
+    which Plotly validates and orjson encodes without walking them element by element.
+    """
+    return {
+        "data": [{
+            "type": "pie",
+            "labels": counts[label].to_numpy(),
+            "values": counts["Count"].to_numpy(),
+        }],
+        "layout": {"legend": {"title": {"text": label}}},
+    }
+
+
+@st.cache_data(max_entries=CONTENT_CACHE_ENTRIES, hash_funcs={pd.DataFrame: hash_dataframe})
+def volume_figure(complaints_by_date):
+    """
+    Builds the complaints-per-date scatter plot, drawn with WebGL so it stays responsive as the sheet grows.
+    """
+    return {
+        "data": [{
+            "type": "scattergl",
+            "mode": "markers",
+            "x": complaints_by_date[DATE_COL].to_numpy(),
+            "y": complaints_by_date["Count"].to_numpy(),
+        }],
+        "layout": {
+            "title": {"text": "Complaint Volume Over Time"},
+            "showlegend": False,
+            "xaxis": {"title": {"text": "Date of Complaint"}},
+            "yaxis": {"title": {"text": "Number of Complaints"}},
+        },
+    }
+
+
+@st.cache_data(max_entries=CONTENT_CACHE_ENTRIES, hash_funcs={pd.DataFrame: hash_dataframe})
+def compute_aggregates(df):
+    """
+    Computes every count table the charts need, keyed by chart.
+    """
+    return {
+        "department": count_values(df, "output.routing_recommendation.department", "Department"),
+        "intent": count_values(df, "output.predicted_intent", "Predicted Intent"),
+        "product": count_values(df, "output.extracted_product", "Product"),
+        "urgency": count_values(df, "output.urgency_level", "Urgency Level"),
+        "action": count_values(df, "output.extracted_requested_action", "Requested Action"),
+        # Group by date and count the number of complaints (dates are parsed by the loader)
+        "by_date": group_complaints_by_date(df),
+    }
+
+
+def build_all_figures(aggs):
+    """
+    Builds every chart's Plotly dict. Each figure is cached on its own count table,
+    so a chart whose counts did not change is not rebuilt when other data changes.
+    """
+    return {
+        "department": pie_figure(aggs["department"], "Department"),
+        "volume": volume_figure(aggs["by_date"]),
+        "intent": bar_figure(aggs["intent"], "Predicted Intent"),
+        "product": bar_figure(aggs["product"], "Product"),
+        "urgency": bar_figure(aggs["urgency"], "Urgency Level"),
+        "action": bar_figure(
+            aggs["action"], "Requested Action", y_title="Number of Complaints", template="plotly_white"
+        ),
+    }
+
+
+# --- Dashboard Panels ---
+# A single poller re-reads the cached data on a timer and reruns the app only when it changed.
+@st.fragment(run_every=REFRESH_INTERVAL)
+def poll_for_changes():
+    df = load_email_data_from_gsheets()
+    digest = hash_dataframe(df)
+    previous = st.session_state.get("data_digest")
+    st.session_state["data_digest"] = digest
+    if previous is not None and previous != digest:
+        st.rerun()
+
+
+def status_panel(df):
+    if df.empty:
+        st.warning("No email data available. Please check your Google Sheet connection.")
+    else:
+        # Show data info
+        st.info(f"⏰ Last updated: {time.strftime('%Y-%m-%d %H:%M:%S')}")
+
+
+# The only panel with a widget; as a fragment, flipping its toggle reruns just this panel
+# with the row passed in by the last full run.
+@st.fragment
+def latest_email_panel(latest_row):
+    st.header("📋 Latest Email (JSON Format)")
+    # Only serialize and send the row to the browser when the reader asks for it
+    if st.toggle("Show latest email", key="show_latest_email"):
+        # orjson handles numpy values natively; anything else it cannot encode falls back to str()
+        latest_json = orjson.dumps(
+            latest_row,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY,
+            default=str,
+        )
+        st.code(latest_json.decode(), language="json")
+
+
+def total_emails_panel(email_count):
+    st.header("Total Emails")
+    st.markdown(f"<div class='pulse pulse-count'>{email_count}</div>", unsafe_allow_html=True)
+
+
+def forwarding_department_panel(latest_row):
     st.header("Forwarding Department")
-    complaint = df["output.extracted_requested_action"].iloc[-1]
-    department = df["output.routing_recommendation.department"].iloc[-1]
-    st.markdown(
-        f"""
-        <div style='font-size: 36px; font-weight: bold; color: #aeb002; text-align: center;
-        animation: pulse 1.5s infinite;'>{complaint}</div>
-        <style>@keyframes pulse {{
-            0% {{ transform: scale(1); opacity: 1; }}
-            50% {{ transform: scale(1.1); opacity: 0.7; }}
-            100% {{ transform: scale(1); opacity: 1; }}
-        }}</style>
-        """,
-        unsafe_allow_html=True
-    )
+    # Blank labels are missing values in the categorical columns; show them as empty text, not "nan"
+    complaint = latest_row["output.extracted_requested_action"]
+    complaint = "" if pd.isna(complaint) else complaint
+    department = latest_row["output.routing_recommendation.department"]
+    department = "" if pd.isna(department) else department
+    # One element for both lines, so a refresh sends a single small HTML update
     st.markdown(
-        f"""
-        <div style='font-size: 72px; font-weight: bold; color: #ffa500; text-align: center;
-        animation: pulse 1.5s infinite;'>{department}</div>
-        <style>@keyframes pulse {{
-            0% {{ transform: scale(1); opacity: 1; }}
-            50% {{ transform: scale(1.1); opacity: 0.7; }}
-            100% {{ transform: scale(1); opacity: 1; }}
-        }}</style>
-        """,
+        f"<div class='pulse pulse-action'>{complaint}</div>"
+        f"<div class='pulse pulse-department'>{department}</div>",
         unsafe_allow_html=True
     )
 
-col1, col2, col3 = st.columns([1, 1, 1])
-with col1:
-        # 1. Emails by Department
-        st.header("Emails by Department")
-        dept_col = "output.routing_recommendation.department"
-        if dept_col in df.columns and len(df[dept_col].dropna()) > 0:
-            department_counts = df[dept_col].value_counts().reset_index()
-            department_counts.columns = ["Department", "Count"]
-            fig_dept = px.pie(
-                department_counts,
-                names="Department",
-                values="Count",
-                color="Department"  # Use color to map to department
-            )
-        st.plotly_chart(fig_dept, use_container_width=True)
-    
-with col2:
+
+# The charts carry stable keys so Streamlit updates the same element in place on every rerun.
+def department_chart(figures):
+    # 1. Emails by Department
+    st.header("Emails by Department")
+    fig_dept = figures["department"]
+    # Only chart departments that actually occur; an all-blank column leaves the slot empty
+    if len(fig_dept["data"][0]["labels"]) > 0:
+        st.plotly_chart(fig_dept, use_container_width=True, key="department_chart")
+    else:
+        st.empty()
+
+
+def complaint_volume_chart(figures):
     st.header("Complaint Volume Over Time")
-    # Convert 'output.extracted_date_of_issue' to datetime
-    df['output.extracted_date_of_issue'] = pd.to_datetime(df['output.extracted_date_of_issue'], errors='coerce')
-    
-    # Drop rows where the date conversion resulted in NaT (i.e., invalid dates)
-    # These rows cannot be plotted on a time-series chart.
-    df_cleaned = df.dropna(subset=['output.extracted_date_of_issue'])
+    fig_time = figures["volume"]
+    # Display the plot in Streamlit, or say why there is nothing to plot
+    if len(fig_time["data"][0]["x"]) > 0:
+        st.plotly_chart(fig_time, use_container_width=True, key="volume_chart")
+    else:
+        st.info("None of the issue dates in the sheet could be read as dates.")
 
-    # Group by date and count the number of complaints
-    # Use the cleaned DataFrame for grouping
-    complaints_by_date = df_cleaned.groupby('output.extracted_date_of_issue').size().reset_index(name='Count')
-    
-    # Create the scatter plot
-    fig_time = px.scatter(
-        complaints_by_date, 
-        x='output.extracted_date_of_issue', 
-        y='Count',
-        title='Complaint Volume Over Time' # Added a title for clarity
-    )
-    
-    # Update layout for better visualization
-    fig_time.update_layout(showlegend=False)
-    fig_time.update_layout(xaxis_title='Date of Complaint', yaxis_title='Number of Complaints') # Added y-axis title
-    
-    # Display the plot in Streamlit
-    st.plotly_chart(fig_time, use_container_width=True)
 
-with col3:
+def intent_chart(figures):
     st.subheader("Complaints by Predicted Intent")
-    intent_counts = df['output.predicted_intent'].value_counts().reset_index()
-    intent_counts.columns = ['Predicted Intent', 'Count']
-    fig_intent = px.bar(intent_counts, 
-                        x='Predicted Intent', 
-                        y='Count',
-                        color='Predicted Intent')
-    st.plotly_chart(fig_intent, use_container_width=True)
-
-col1, col2, col3 =  st.columns([1, 1, 1])
-with col1:
+    fig_intent = figures["intent"]
+    st.plotly_chart(fig_intent, use_container_width=True, key="intent_chart")
+
+
+def product_chart(figures):
     st.header("Complaints by Product")
-    product_counts = df['output.extracted_product'].value_counts().reset_index()
-    product_counts.columns = ['Product', 'Count']
-    fig_product = px.bar(product_counts, 
-                            x='Product', 
-                            y='Count', 
-                             color='Product')
-    st.plotly_chart(fig_product, use_container_width=True)
+    fig_product = figures["product"]
+    st.plotly_chart(fig_product, use_container_width=True, key="product_chart")
 
-with col2:
+
+def urgency_chart(figures):
     st.header(" Distribution of Urgency Levels")
-    urgency_counts = df['output.urgency_level'].value_counts().reset_index()
-    urgency_counts.columns = ['Urgency Level', 'Count']
-    fig_urgency = px.bar(urgency_counts, 
-                             x='Urgency Level', 
-                             y='Count', 
-                             color='Urgency Level')
-    st.plotly_chart(fig_urgency, use_container_width=True)
+    fig_urgency = figures["urgency"]
+    st.plotly_chart(fig_urgency, use_container_width=True, key="urgency_chart")
 
-with col3:
+
+def requested_action_chart(figures):
     st.subheader("Complaints by Requested Action")
-    # Count occurrences of each requested action
-    action_counts = df['output.extracted_requested_action'].value_counts().reset_index()
-    action_counts.columns = ['Requested Action', 'Count'] # Rename columns for clarity
-    fig_action = px.bar(action_counts,
-                                x='Requested Action',
-                                y='Count',
-                                color='Requested Action', # Color bars by requested action
-                                labels={'Count': 'Number of Complaints'},
-                                template='plotly_white')
-    fig_action.update_layout(xaxis_title='Requested Action', yaxis_title='Number of Complaints')
-    st.plotly_chart(fig_action, use_container_width=True)
-
-st.cache_data.clear()
-time.sleep(10)
-st.rerun()
+    fig_action = figures["action"]
+    st.plotly_chart(fig_action, use_container_width=True, key="action_chart")
+
+
+# --- Streamlit App Layout ---
+st.set_page_config(layout="wide", page_title="Email Workflow Dashboard")
+
+
+st.title("✉️ Customer Email Insights Dashboard")
+st.markdown(pulse_css(), unsafe_allow_html=True)  # Styles used by the pulsing panels
+poll_for_changes()
+
+# Load the sheet once per run
+df = load_email_data_from_gsheets()
+status_panel(df)
+
+if df.empty:
+    st.stop()  # status_panel has already explained why there is nothing to show
+missing_columns = sorted(set(REQUIRED_COLUMNS).difference(df.columns))
+if missing_columns:
+    st.error(f"The Google Sheet is missing expected columns: {', '.join(missing_columns)}")
+    st.stop()
+
+# Compute everything the panels show once per run; the panels only read these
+figures = build_all_figures(compute_aggregates(df))
+# Slice the last row once, as a one-row frame that keeps column dtypes; the parsed date is internal
+last = df.iloc[[-1]].drop(columns=PARSED_DATE_COL)
+latest_row = last.to_dict(orient="records")[0]
+# to_dict widens the float32 scores to Python floats (0.35 -> 0.3499999940395355);
+# keep them as numpy scalars so orjson prints their shortest float32 form
+latest_row.update({col: last[col].iat[0] for col in NUMERIC_COLS if col in last.columns})
+
+col1, col2, col3 = st.columns([2, 1, 1])
+with col1:
+    latest_email_panel(latest_row)
+with col2:
+    total_emails_panel(len(df))
+with col3:
+    forwarding_department_panel(latest_row)
+
+col1, col2, col3 = st.columns([1, 1, 1])
+with col1:
+    department_chart(figures)
+with col2:
+    complaint_volume_chart(figures)
+with col3:
+    intent_chart(figures)
+
+col1, col2, col3 = st.columns([1, 1, 1])
+with col1:
+    product_chart(figures)
+with col2:
+    urgency_chart(figures)
+with col3:
+    requested_action_chart(figures)